@@ -4,21 +4,18 @@ Vavoo.to M3U8 Scraper
 Otomatik kanal çekme ve M3U8 playlist oluşturma
 """
 
-import requests
 import json
 import re
 import os
-import base64
-import random
+import sys
 import warnings
 from datetime import datetime
-from urllib.parse import quote_plus
 
 # Disable SSL warnings
 warnings.filterwarnings("ignore", message="Unverified HTTPS request")
 
-# Import tracker - will be imported dynamically
-tracker_loaded = False
+# requests, tracker and the HTTP server are imported lazily so that
+# offline subcommands (render, diff, serve) start without network setup
 
 # Constants
 BASEURL = "https://www2.vavoo.to/ccapi/"
@@ -30,22 +27,87 @@ VEC_URL = "http://mastaaa1987.github.io/repo/veclist.json"
 
 # Output directory
 OUTPUT_DIR = "output"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+# Intermediate snapshots written between stages (inside the output directory)
+STAGE_DIR = ".stage"
+
+# Startup budget for the render subcommand, checked by `bench`
+RENDER_STARTUP_BUDGET_MS = 100.0
+
+
+def snapshot_path(output_dir, name):
+    """Path of an intermediate stage snapshot"""
+    return os.path.join(output_dir, STAGE_DIR, f"{name}.json")
+
+
+def save_snapshot(output_dir, name, data):
+    """Write an intermediate stage snapshot"""
+    filepath = snapshot_path(output_dir, name)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+    print(f"Saved snapshot: {filepath}")
+    return filepath
+
+
+def load_snapshot(output_dir, name):
+    """Read an intermediate stage snapshot, None if it does not exist"""
+    filepath = snapshot_path(output_dir, name)
+    if not os.path.exists(filepath):
+        return None
+
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_groups(output_dir):
+    """Load merged groups from the merge snapshot, falling back to channels.json"""
+    groups = load_snapshot(output_dir, "merged")
+    if groups is not None:
+        return groups
+
+    channels_file = os.path.join(output_dir, "channels.json")
+    if os.path.exists(channels_file):
+        with open(channels_file, "r", encoding="utf-8") as f:
+            return json.load(f).get("groups", {})
+
+    return None
+
+
+def is_newer(path, other):
+    """True if both files exist and path was written after other"""
+    return (
+        os.path.exists(path)
+        and os.path.exists(other)
+        and os.path.getmtime(path) > os.path.getmtime(other)
+    )
 
 
 class VavooScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            }
-        )
+    def __init__(self, output_dir=OUTPUT_DIR):
+        self.output_dir = output_dir
+        self._session = None
         self.channels = []
         self.groups = {}
         self.auth_token = None
         self.watched_sig = None
 
+    @property
+    def session(self):
+        """HTTP session, created on first network access"""
+        if self._session is None:
+            import requests
+
+            self._session = requests.Session()
+            self._session.headers.update(
+                {
+                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+                }
+            )
+        return self._session
+
     def get_veclist(self):
         """Get vector list for auth"""
         try:
@@ -58,6 +120,8 @@ class VavooScraper:
 
     def get_auth_signature(self):
         """Get authentication signature from vavoo.tv"""
+        import random
+
         veclist = self.get_veclist()
         if not veclist:
             print("No veclist available")
@@ -372,13 +436,14 @@ class VavooScraper:
         print("Generating M3U8 files...")
 
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        os.makedirs(self.output_dir, exist_ok=True)
 
         for country, channels in self.groups.items():
             if not channels:
                 continue
 
             filename = re.sub(r"[^\w\-_\.]", "_", country)
-            filepath = os.path.join(OUTPUT_DIR, f"{filename}.m3u8")
+            filepath = os.path.join(self.output_dir, f"{filename}.m3u8")
 
             with open(filepath, "w", encoding="utf-8") as f:
                 f.write(f"#EXTM3U\n")
@@ -421,7 +486,8 @@ class VavooScraper:
 
     def save_json(self):
         """Save channels as JSON for tracking changes"""
-        filepath = os.path.join(OUTPUT_DIR, "channels.json")
+        os.makedirs(self.output_dir, exist_ok=True)
+        filepath = os.path.join(self.output_dir, "channels.json")
 
         data = {
             "updated": datetime.now().isoformat(),
@@ -435,42 +501,36 @@ class VavooScraper:
 
         print(f"Saved JSON: {filepath}")
 
-    def run(self):
-        """Main execution"""
-        print("=" * 60)
-        print("Vavoo.to M3U8 Scraper")
-        print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print("=" * 60)
-
-        # Get signatures
-        print("\n[1/5] Getting authentication signatures...")
+    def fetch(self):
+        """Fetch stage: signatures and raw channel lists"""
+        print("Getting authentication signatures...")
         self.auth_token = self.get_auth_signature()
         self.watched_sig = self.get_watched_signature()
 
         if not self.auth_token and not self.watched_sig:
             print("Warning: Could not get authentication tokens, continuing anyway...")
 
-        # Fetch channels
-        print("\n[2/5] Fetching live channels...")
         live_channels = self.fetch_live_channels()
 
-        print("\n[3/5] Fetching API channels...")
         api_channels = self.fetch_api_channels()
 
-        # Process
-        print("\n[4/5] Processing channels...")
+        save_snapshot(
+            self.output_dir, "fetch", {"live": live_channels, "api": api_channels}
+        )
+        return live_channels, api_channels
+
+    def merge(self, live_channels, api_channels):
+        """Merge stage: process raw channel lists into groups"""
         self.process_channels(live_channels, api_channels)
 
         print(f"\nTotal groups: {len(self.groups)}")
         print(f"Total channels: {sum(len(ch) for ch in self.groups.values())}")
 
-        # Generate outputs
-        print("\n[5/5] Generating output files...")
-        self.generate_m3u8()
-        self.save_json()
+        save_snapshot(self.output_dir, "merged", self.groups)
+        return self.groups
 
-        # Track changes
-        print("\n[6/6] Tracking changes...")
+    def track(self):
+        """Diff stage: compare merged groups with the previous channels.json"""
         try:
             from tracker import (
                 load_previous_channels,
@@ -479,23 +539,311 @@ class VavooScraper:
                 print_diff,
             )
 
-            old_data = load_previous_channels()
+            old_data = load_previous_channels(self.output_dir)
             diff = compare_channels(old_data, self.groups)
             print_diff(diff)
-            save_history(diff)
+            save_history(diff, self.output_dir)
 
             # Save diff report
-            diff_file = os.path.join(OUTPUT_DIR, "diff_report.json")
+            diff_file = os.path.join(self.output_dir, "diff_report.json")
             with open(diff_file, "w", encoding="utf-8") as f:
                 json.dump(diff, f, indent=2, ensure_ascii=False)
+            return diff
         except Exception as e:
             print(f"Tracker error (non-critical): {e}")
+            return None
+
+    def render(self):
+        """Render stage: write M3U8 playlists and channels.json"""
+        self.generate_m3u8()
+        self.save_json()
+
+    def run(self):
+        """Main execution"""
+        print("=" * 60)
+        print("Vavoo.to M3U8 Scraper")
+        print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print("=" * 60)
+
+        print("\n[1/4] Fetching channels...")
+        live_channels, api_channels = self.fetch()
+
+        print("\n[2/4] Processing channels...")
+        self.merge(live_channels, api_channels)
+
+        # Diff before rendering, otherwise channels.json is already overwritten
+        print("\n[3/4] Tracking changes...")
+        self.track()
+
+        print("\n[4/4] Generating output files...")
+        self.render()
 
         print("\n" + "=" * 60)
         print("Done!")
         print("=" * 60)
 
 
+def cmd_run(args):
+    VavooScraper(args.output).run()
+    return 0
+
+
+def cmd_fetch(args):
+    VavooScraper(args.output).fetch()
+    return 0
+
+
+def cmd_merge(args):
+    data = load_snapshot(args.output, "fetch")
+    if data is None:
+        print("No fetch snapshot found, run 'fetch' first")
+        return 1
+
+    VavooScraper(args.output).merge(data.get("live", []), data.get("api", []))
+    return 0
+
+
+def cmd_diff(args):
+    groups = load_snapshot(args.output, "merged")
+    if groups is None:
+        print("No merge snapshot found, run 'merge' first")
+        return 1
+
+    if is_newer(
+        os.path.join(args.output, "channels.json"),
+        snapshot_path(args.output, "merged"),
+    ):
+        print("channels.json was rendered after the merge snapshot")
+        print("Run 'diff' before 'render', otherwise the diff is always empty")
+        return 1
+
+    scraper = VavooScraper(args.output)
+    scraper.groups = groups
+    return 0 if scraper.track() is not None else 1
+
+
+def cmd_render(args):
+    input_dir = args.input or args.output
+    groups = load_groups(input_dir)
+    if groups is None:
+        print("No merge snapshot or channels.json found, run 'merge' first")
+        return 1
+
+    merged_file = snapshot_path(input_dir, "merged")
+    if os.path.exists(merged_file) and not is_newer(
+        os.path.join(input_dir, "diff_report.json"), merged_file
+    ):
+        print("Warning: merge snapshot not diffed yet, run 'diff' before 'render'")
+
+    scraper = VavooScraper(args.output)
+    scraper.groups = groups
+    scraper.render()
+    return 0
+
+
+def cmd_serve(args):
+    from functools import partial
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+    from threading import Lock
+    from urllib.parse import unquote, urlsplit
+
+    listing_lock = Lock()
+
+    class OutputHandler(SimpleHTTPRequestHandler):
+        """Serve rendered files only, never the stage snapshots"""
+
+        def send_head(self):
+            path = unquote(urlsplit(self.path).path)
+            if STAGE_DIR in path.split("/"):
+                self.send_error(404, "File not found")
+                return None
+            return super().send_head()
+
+        def list_directory(self, path):
+            # Hide the snapshot directory from listings as well; the lock keeps
+            # concurrent requests from restoring each other's os.listdir
+            with listing_lock:
+                listdir = os.listdir
+                os.listdir = lambda p: [n for n in listdir(p) if n != STAGE_DIR]
+                try:
+                    return super().list_directory(path)
+                finally:
+                    os.listdir = listdir
+
+    handler = partial(OutputHandler, directory=args.output)
+    with ThreadingHTTPServer((args.host, args.port), handler) as server:
+        print(f"Serving {args.output} on http://{args.host}:{args.port}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+# Runs `render` in a fresh interpreter, records when the render stage starts
+# and reports which heavy modules the render path loaded
+BENCH_RENDER = """
+import json, os, sys, time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, sys.argv[1])
+import scraper
+
+started = []
+render = scraper.VavooScraper.render
+
+
+def timed_render(self):
+    started.append(time.time())
+    render(self)
+
+
+scraper.VavooScraper.render = timed_render
+with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+    code = scraper.main(sys.argv[2:])
+
+print(json.dumps({
+    "code": code,
+    "started": started[0] if started else None,
+    "requests": "requests" in sys.modules,
+    "tracker": "tracker" in sys.modules,
+}))
+"""
+
+
+def cmd_bench(args):
+    import subprocess
+    import tempfile
+    import time
+
+    if args.runs < 1:
+        print("--runs must be at least 1")
+        return 1
+
+    input_dir = args.input or args.output
+    if load_groups(input_dir) is None:
+        print("No merge snapshot or channels.json found, run 'merge' first")
+        return 1
+
+    def launch(cmd):
+        start = time.time()
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip() or f"exit code {proc.returncode}")
+        return start, time.time(), proc.stdout
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    baseline = None
+    results = []
+
+    try:
+        for _ in range(args.runs):
+            start, end, _ = launch([sys.executable, "-c", "pass"])
+            elapsed = (end - start) * 1000
+            baseline = elapsed if baseline is None else min(baseline, elapsed)
+
+            with tempfile.TemporaryDirectory() as tmp:
+                start, end, stdout = launch(
+                    [sys.executable, "-c", BENCH_RENDER, script_dir]
+                    + ["render", "--input", input_dir, "--output", tmp]
+                )
+            result = json.loads(stdout.splitlines()[-1])
+            if result["code"] != 0 or result["started"] is None:
+                raise RuntimeError("render did not run")
+
+            result["startup"] = (result["started"] - start) * 1000
+            result["total"] = (end - start) * 1000
+            results.append(result)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"FAIL: render subprocess failed: {e}")
+        return 1
+
+    startup = min(r["startup"] for r in results)
+    total = min(r["total"] for r in results)
+    overhead = startup - baseline
+    network_loaded = any(r["requests"] for r in results)
+    tracker_loaded = any(r["tracker"] for r in results)
+
+    print(f"Python startup:    {baseline:8.1f} ms")
+    print(f"render startup:    {startup:8.1f} ms ({overhead:.1f} ms over Python)")
+    print(f"render total:      {total:8.1f} ms")
+    print(f"requests imported: {'yes' if network_loaded else 'no'}")
+    print(f"tracker imported:  {'yes' if tracker_loaded else 'no'}")
+
+    if network_loaded or tracker_loaded or overhead > args.budget:
+        print(f"FAIL: render must start within {args.budget:.0f} ms without network")
+        return 1
+
+    print("OK")
+    return 0
+
+
+def build_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Vavoo.to M3U8 Scraper")
+    parser.add_argument(
+        "-o", "--output", default=OUTPUT_DIR, help="output directory"
+    )
+    parser.set_defaults(func=cmd_run)
+
+    # Lets every subcommand take -o as well; SUPPRESS keeps the top-level value
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "-o",
+        "--output",
+        default=argparse.SUPPRESS,
+        help=f"output directory (default: {OUTPUT_DIR})",
+    )
+
+    sub = parser.add_subparsers(title="commands")
+
+    def add_command(name, func, text):
+        p = sub.add_parser(name, parents=[common], help=text, description=text)
+        p.set_defaults(func=func)
+        return p
+
+    add_command("run", cmd_run, "full pipeline: fetch, merge, diff, render")
+    add_command("fetch", cmd_fetch, "fetch raw channel lists (network)")
+    add_command("merge", cmd_merge, "merge the fetch snapshot into groups")
+    add_command(
+        "diff",
+        cmd_diff,
+        "compare the merge snapshot with the previous channels.json "
+        "(run before render)",
+    )
+
+    p = add_command(
+        "render",
+        cmd_render,
+        "write M3U8 playlists and channels.json (run after diff)",
+    )
+    p.add_argument(
+        "-i",
+        "--input",
+        help="directory to read groups from (default: output directory)",
+    )
+
+    p = add_command("serve", cmd_serve, "serve rendered playlists over HTTP")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8000)
+
+    p = add_command("bench", cmd_bench, "check render startup time (no network)")
+    p.add_argument(
+        "-i",
+        "--input",
+        help="directory to read groups from (default: output directory)",
+    )
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--budget", type=float, default=RENDER_STARTUP_BUDGET_MS)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
 if __name__ == "__main__":
-    scraper = VavooScraper()
-    scraper.run()
+    sys.exit(main())
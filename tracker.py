@@ -8,12 +8,11 @@ import os
 from datetime import datetime
 
 OUTPUT_DIR = "output"
-HISTORY_FILE = os.path.join(OUTPUT_DIR, "history.json")
 
 
-def load_previous_channels():
+def load_previous_channels(output_dir=OUTPUT_DIR):
     """Önceki kanal listesini yükle"""
-    channels_file = os.path.join(OUTPUT_DIR, "channels.json")
+    channels_file = os.path.join(output_dir, "channels.json")
     if os.path.exists(channels_file):
         with open(channels_file, "r", encoding="utf-8") as f:
             return json.load(f)
@@ -106,12 +105,13 @@ def compare_channels(old_data, new_groups):
     }
 
 
-def save_history(diff_result):
+def save_history(diff_result, output_dir=OUTPUT_DIR):
     """Değişiklik geçmişini kaydet"""
+    history_file = os.path.join(output_dir, "history.json")
     history = []
 
-    if os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+    if os.path.exists(history_file):
+        with open(history_file, "r", encoding="utf-8") as f:
             history = json.load(f)
 
     entry = {
@@ -127,7 +127,7 @@ def save_history(diff_result):
     # Son 100 kaydı tut
     history = history[:100]
 
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
+    with open(history_file, "w", encoding="utf-8") as f:
         json.dump(history, f, indent=2)
 
 